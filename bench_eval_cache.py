@@ -0,0 +1,81 @@
+# Regression check + micro-benchmark for the evaluate() result cache.
+# Run: python bench_eval_cache.py  (exits non-zero if a check fails)
+import copy
+import json
+import timeit
+
+import orjson
+
+import risk_assesment_rule_engine as E
+
+N = 20000
+
+def _us(fn):
+    return min(timeit.repeat(fn, number=N, repeat=5)) / N * 1e6
+
+def _strip_ts(out):
+    return {k: v for k, v in out.items() if k != "timestamp"}
+
+def _same(fn_a, fn_b):
+    # Same result, or the same exception type
+    try:
+        a = fn_a()
+    except Exception as e:
+        try:
+            fn_b()
+        except Exception as e2:
+            return type(e) is type(e2)
+        return False
+    return _strip_ts(a) == _strip_ts(fn_b())
+
+def check_non_finite_not_keyed():
+    # orjson writes NaN/Infinity as null, so these must never share a key with the null payload
+    for bad in (float("nan"), float("inf"), float("-inf")):
+        E.clear_eval_cache()
+        p_bad = {"case_id": "X", "thresholds": {"edd_cutoff_score": bad}}
+        p_null = {"case_id": "X", "thresholds": {"edd_cutoff_score": None}}
+        assert E._payload_key(p_bad) is None
+        assert E._payload_key(p_null) is not None
+        assert _same(lambda: E.evaluate(p_bad), lambda: E._evaluate(p_bad, E.RP_C))
+        assert not E._EVAL_CACHE, "non-finite payload was cached"
+        assert _same(lambda: E.evaluate(p_null), lambda: E._evaluate(p_null, E.RP_C))
+        # Raw request bodies keep the literal NaN/Infinity text, so they get their own key
+        E.clear_eval_cache()
+        raw_bad, raw_null = json.dumps(p_bad).encode(), json.dumps(p_null).encode()
+        assert _same(lambda: E.evaluate(p_bad, raw_bad), lambda: E._evaluate(p_bad, E.RP_C))
+        assert _same(lambda: E.evaluate(p_null, raw_null), lambda: E._evaluate(p_null, E.RP_C))
+
+def check_mutation_isolation(payload):
+    E.clear_eval_cache()
+    first = E.evaluate(payload)
+    baseline = copy.deepcopy(_strip_ts(first))
+    first["injected"] = 1
+    first["dimensions"] = None
+    second = E.evaluate(payload)
+    assert _strip_ts(second) == baseline, "top-level changes leaked into the cache"
+    second["injected"] = 2
+    assert _strip_ts(E.evaluate(payload)) == baseline
+
+def main():
+    with open("sample_payload.json", "rb") as f:
+        raw = f.read()
+    payload = json.loads(raw)
+    check_non_finite_not_keyed()
+    check_mutation_isolation(payload)
+
+    rp = E.RP_C
+    E.clear_eval_cache()
+    E.evaluate(payload)
+    E.evaluate(payload, raw)
+    t_eval = _us(lambda: E._evaluate(payload, rp))
+    t_hit = _us(lambda: E.evaluate(payload))
+    t_hit_raw = _us(lambda: E.evaluate(payload, raw))
+    print(f"_evaluate        {t_eval:6.1f}us")
+    print(f"hit (dict key)   {t_hit:6.1f}us")
+    print(f"hit (body key)   {t_hit_raw:6.1f}us")
+    # /evaluate keys on the request body; the dict-key path is informational
+    assert t_hit_raw < t_eval, "cache hit is slower than evaluating"
+    print("ok")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 import os
 import math
+import bisect
+import heapq
+import threading
+import time
+import orjson
 import yaml
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 from datetime import datetime
+from dataclasses import dataclass
 
 from pydantic import RootModel
 from typing import Any, Dict
@@ -15,21 +21,158 @@ from typing import Any, Dict
 # Load rulepack
 # ---------------------------
 RULEPACK_PATH = os.getenv("RULEPACK_PATH", "rulepack.yaml")
+MAX_BATCH_CASES = int(os.getenv("MAX_BATCH_CASES", "500"))
+EVAL_CACHE_SIZE = int(os.getenv("EVAL_CACHE_SIZE", "4096"))
+
+# libyaml-backed loader when PyYAML was built with it, pure-Python otherwise
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def rulepack_json_path() -> str:
+    # Precompiled sibling of the YAML (rulepack.yaml -> rulepack.json).
+    # CI should regenerate it with write_rulepack_json() whenever the YAML is edited.
+    return os.path.splitext(RULEPACK_PATH)[0] + ".json"
+
+def write_rulepack_json() -> str:
+    with open(RULEPACK_PATH, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_YAML_LOADER)
+    out = rulepack_json_path()
+    with open(out, "wb") as f:
+        f.write(orjson.dumps(data))
+    return out
 
 def load_rulepack() -> Dict[str, Any]:
     if not os.path.exists(RULEPACK_PATH):
         raise FileNotFoundError(f"Rulepack not found at {RULEPACK_PATH}")
-    with open(RULEPACK_PATH, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    json_path = rulepack_json_path()
+    # The YAML stays the source of truth; only trust the JSON if it is at least as new
+    if os.path.exists(json_path) and os.path.getmtime(json_path) >= os.path.getmtime(RULEPACK_PATH):
+        with open(json_path, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(RULEPACK_PATH, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=_YAML_LOADER)
     if "rulepack" not in data:
         raise ValueError("Invalid rulepack: missing 'rulepack' root")
     return data["rulepack"]
 
+# ---------------------------
+# Compiled rulepack
+# ---------------------------
+# Flattened rulepack, built once per load so evaluate() reads attributes, not nested YAML dicts
+@dataclass(frozen=True, slots=True)
+class CompiledRulepack:
+    version: str
+    policy_refs: Tuple[str, ...]
+
+    sufficiency_min_default: float
+    edd_cutoff_default: float
+    band_high: float
+    band_medium: float
+
+    geo_base_map: Dict[str, int]
+    geo_grey_names: Tuple[str, ...]
+    geo_black_names: Tuple[str, ...]
+    geo_grey: FrozenSet[str]
+    geo_black: FrozenSet[str]
+    geo_add_grey: int
+    geo_add_black: int
+
+    ps_rules: Dict[str, Tuple[int, str, str, Optional[str]]]
+
+    am_sev_to_score: Dict[str, int]
+    am_sev_to_label: Dict[str, str]
+
+    pr_base_by_pattern: Dict[str, int]
+    pr_base_other: int
+    pr_add_salaried_high_cash: int
+    pr_add_rental_count_mismatch: int
+    pr_add_dividend_missing_proof: int
+
+    eg_base_when_low: int
+    eg_base_when_ok: int
+    eg_issue_points: Dict[str, int]
+    eg_max_issue_points: int
+    eg_align_points: Dict[str, int]
+    eg_max_align_points: int
+
+    pc_base_by_label: Dict[str, int]
+    pc_channel_adders: Dict[str, int]
+    pc_add_non_uae_flow: int
+    pc_add_offshore_hint: int
+    pc_offshore_keywords: Tuple[str, ...]
+
+def compile_rulepack(rp: Dict[str, Any]) -> CompiledRulepack:
+    thr = rp["thresholds"]
+    dims = rp["dimensions"]
+
+    geo_cfg = dims["geo_risk"]
+    fatf_conf = geo_cfg["modifiers"]["fatf_exposure"]
+    grey_names = tuple(fatf_conf["list"]["grey"] or [])
+    black_names = tuple(fatf_conf["list"]["black"] or [])
+
+    ps_rules = {}
+    for r in dims["pep_sanctions"]["rules"]:
+        # First rule per "when" wins, as the evaluator used to pick with next()
+        ps_rules.setdefault(r["when"], (r["score"], r["label"], r["reason"], r.get("hard_route")))
+
+    am_map = dims["adverse_media"]["mapping"]
+    pat_cfg = dims["pattern_risk"]
+    mod_cfg = pat_cfg["inconsistency_modifiers"]
+    eg_cfg = dims["evidence_gaps"]["scoring"]
+    align_map = eg_cfg["partial_alignment_points"]
+    pc_cfg = dims["product_channel"]
+
+    return CompiledRulepack(
+        version=rp.get("rulepack_version", "unknown"),
+        policy_refs=tuple(rp.get("policy_refs", [])),
+
+        sufficiency_min_default=thr["sufficiency_min_default"],
+        edd_cutoff_default=thr["edd_cutoff_score_default"],
+        band_high=thr["bands"]["high"],
+        band_medium=thr["bands"]["medium"],
+
+        geo_base_map=dict(geo_cfg["score_map"]["base"]),
+        geo_grey_names=grey_names,
+        geo_black_names=black_names,
+        geo_grey=frozenset(n.lower() for n in grey_names),
+        geo_black=frozenset(n.lower() for n in black_names),
+        geo_add_grey=fatf_conf["add_if_in"]["grey"],
+        geo_add_black=fatf_conf["add_if_in"]["black"],
+
+        ps_rules=ps_rules,
+
+        am_sev_to_score=dict(am_map["severity_to_score"]),
+        am_sev_to_label=dict(am_map["severity_to_label"]),
+
+        pr_base_by_pattern=dict(pat_cfg["base_by_pattern"]),
+        pr_base_other=pat_cfg["base_by_pattern"]["Other"],
+        pr_add_salaried_high_cash=mod_cfg["salaried_high_cash"],
+        pr_add_rental_count_mismatch=mod_cfg["rental_count_mismatch"],
+        pr_add_dividend_missing_proof=mod_cfg["dividend_missing_proof"],
+
+        eg_base_when_low=eg_cfg["base_from_sufficiency"]["when_low"],
+        eg_base_when_ok=eg_cfg["base_from_sufficiency"]["when_ok"],
+        eg_issue_points=dict(eg_cfg["per_issue_points"]),
+        eg_max_issue_points=eg_cfg["max_issue_points"],
+        eg_align_points=dict(align_map),
+        eg_max_align_points=align_map["max_alignment_points"],
+
+        pc_base_by_label=dict(pc_cfg["base_by_label"]),
+        pc_channel_adders=dict(pc_cfg["channel_adders"]),
+        pc_add_non_uae_flow=pc_cfg["cross_border_adders"]["non_uae_flow"],
+        pc_add_offshore_hint=pc_cfg["cross_border_adders"]["offshore_investment_hint"],
+        pc_offshore_keywords=tuple(k.lower() for k in pc_cfg.get("offshore_keywords", []) or []),
+    )
+
 RULEPACK = load_rulepack()
+RP_C = compile_rulepack(RULEPACK)
 
 # ---------------------------
 # Helpers
 # ---------------------------
+_UAE = frozenset({"uae"})
+_SALARIED_PATTERNS = frozenset({"WPS_Salary", "Salary_Plus_Property"})
+
 def clamp(x: float, lo: float = 0.0, hi: float = 1.0) -> float:
     return max(lo, min(hi, x))
 
@@ -42,53 +185,58 @@ def safe_get(d: Dict, path: str, default=None):
             return default
     return cur
 
-def avg(values: List[float]) -> float:
-    if not values:
-        return 0.0
-    return sum(values) / len(values)
+# Inclusive upper bounds for the low/medium labels; anything above is high
+DIM_LABELS = ("low", "medium", "high")
+PR_LABEL_BOUNDS = (9, 19)
+EG_LABEL_BOUNDS = (7, 15)
+PC_LABEL_BOUNDS = (7, 14)
+
+def label_from_bounds(score: float, bounds: Tuple[float, ...]) -> str:
+    return DIM_LABELS[bisect.bisect_left(bounds, score)]
 
 def lower(s: Optional[str]) -> str:
     return (s or "").lower()
 
-def any_in(collection: List[str], targets: List[str]) -> Optional[str]:
-    s = set([c.lower() for c in collection or []])
-    for t in targets or []:
-        if t.lower() in s:
-            return t
-    return None
-
-def exists_alignment_mismatch(dvds: List[Dict[str, Any]], types: List[str]) -> bool:
-    for item in dvds or []:
-        if item.get("source_type") in types and item.get("alignment") in ["partial", "mismatch", "missing"]:
-            return True
-    return False
+_MISALIGNED = frozenset({"partial", "mismatch", "missing"})
 
-def collect_alignment_points(dvds: List[Dict[str, Any]], mapping: Dict[str, int], cap: int) -> int:
+# One pass over declared-vs-discovered: (rental_mm, dividend_mm, property_or_dividend_mm, capped points)
+def _scan_dvds(dvds: List[Dict[str, Any]], align_map: Dict[str, int], cap: int) -> Tuple[bool, bool, bool, int]:
+    rental_mm = dividend_mm = prop_or_div_mm = False
     pts = 0
     for item in dvds or []:
-        pts += mapping.get(item.get("alignment", "aligned"), 0)
-        if pts >= cap:
-            return cap
-    return min(pts, cap)
-
-def offshore_hint(products: List[str], keywords: List[str]) -> bool:
+        if pts < cap:
+            pts += align_map.get(item.get("alignment", "aligned"), 0)
+        if item.get("alignment") in _MISALIGNED:
+            st = item.get("source_type")
+            if st == "Property Holdings":
+                rental_mm = prop_or_div_mm = True
+            elif st == "Rental Income":
+                rental_mm = True
+            elif st == "Dividend":
+                dividend_mm = prop_or_div_mm = True
+    return rental_mm, dividend_mm, prop_or_div_mm, min(pts, cap)
+
+def offshore_hint(products: List[str], keywords: Tuple[str, ...]) -> bool:
+    # keywords are lowercased by compile_rulepack()
     p = ", ".join(products or [])
     p_l = lower(p)
-    return any(k.lower() in p_l for k in keywords or [])
+    return any(k in p_l for k in keywords or ())
+
+def first_listed(hits: Set[str], names: Tuple[str, ...]) -> Optional[str]:
+    # Report the first rulepack entry (original casing) among lowercased hits
+    if not hits:
+        return None
+    return next(n for n in names if n.lower() in hits)
 
-def cross_border(source_countries: List[str], payment_countries: List[str]) -> bool:
-    # Any non-UAE flow
-    def non_uae(arr):
-        return any(lower(c) != "uae" for c in (arr or []))
-    return non_uae(source_countries) or non_uae(payment_countries)
+def cross_border(source_countries: List[str], pay_set: Set[str]) -> bool:
+    # Any non-UAE flow; pay_set holds the lowercased payment countries
+    return bool(pay_set - _UAE) or any(lower(c) != "uae" for c in (source_countries or []))
 
 def collect_top_reasons(dimensions: Dict[str, Dict[str, Any]], limit: int = 3) -> str:
-    # naïve selection: pick the three highest scores' reasons
-    scored = []
-    for k, v in dimensions.items():
-        scored.append((v.get("score", 0), v.get("reason", "")))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    reasons = [r for _, r in scored if r][:limit]
+    # pick the reasons of the highest-scoring dimensions (ties keep dimension order)
+    top = heapq.nlargest(limit, (v for v in dimensions.values() if v.get("reason")),
+                         key=lambda v: v.get("score", 0))
+    reasons = [v["reason"] for v in top]
     return "; ".join(reasons) if reasons else "Multiple factors"
 
 # ---------------------------
@@ -97,19 +245,95 @@ def collect_top_reasons(dimensions: Dict[str, Dict[str, Any]], limit: int = 3) -
 class EvaluateRequest(RootModel[Dict[str, Any]]):
     pass
 
+class BatchRequest(RootModel[Dict[str, List[Dict[str, Any]]]]):
+    # {"cases": [<evaluate payload>, ...]}
+    pass
+
+# (epoch second, formatted timestamp); swapped as one tuple so readers never see a torn pair
+_TS_CACHE: Tuple[int, str] = (0, "")
+
+def _now_iso() -> str:
+    global _TS_CACHE
+    t = int(time.time())
+    cached = _TS_CACHE
+    if cached[0] != t:
+        cached = _TS_CACHE = (t, datetime.utcfromtimestamp(t).isoformat() + "Z")
+    return cached[1]
+
+# ---------------------------
+# Result cache
+# ---------------------------
+# evaluate() is deterministic for a given rulepack and payload (apart from the
+# timestamp), so repeat calls are served from a bounded FIFO cache. Hits share
+# their nested dicts/lists with the cache: treat evaluate() results as read-only.
+_EVAL_CACHE: Dict[Tuple[str, bytes], Dict[str, Any]] = {}
+_EVAL_CACHE_LOCK = threading.Lock()
+
+def _has_non_finite(obj: Any) -> bool:
+    t = type(obj)
+    if t is dict:
+        obj = obj.values()
+    elif t is float:
+        return not math.isfinite(obj)
+    elif t is not list:
+        return False
+    for v in obj:
+        t = type(v)
+        if t is float:
+            if not math.isfinite(v):
+                return True
+        elif (t is dict or t is list) and _has_non_finite(v):
+            return True
+    return False
+
+def _payload_key(payload: Dict[str, Any]) -> Optional[bytes]:
+    # The sorted-key JSON bytes are the key itself; hashing bytes is cheap for a dict
+    try:
+        raw = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    except TypeError:  # not JSON-serializable; evaluate without caching
+        return None
+    # orjson writes NaN/Infinity as null, so only then can two payloads collide
+    if b"null" in raw and _has_non_finite(payload):
+        return None
+    return raw
+
+def clear_eval_cache() -> None:
+    with _EVAL_CACHE_LOCK:
+        _EVAL_CACHE.clear()
+
+def evaluate(payload: Dict[str, Any], raw: Optional[bytes] = None) -> Dict[str, Any]:
+    # raw: the JSON text payload was parsed from, if known; used as the key as-is
+    rp = RP_C
+    if EVAL_CACHE_SIZE <= 0:
+        return _evaluate(payload, rp)
+    if raw is None:
+        raw = _payload_key(payload)
+        if raw is None:
+            return _evaluate(payload, rp)
+    key = (rp.version, raw)
+    hit = _EVAL_CACHE.get(key)
+    if hit is not None:
+        return {**hit, "timestamp": _now_iso()}
+    out = _evaluate(payload, rp)
+    with _EVAL_CACHE_LOCK:
+        # Skip results computed against a pack that /reload has since replaced
+        if rp is RP_C:
+            if len(_EVAL_CACHE) >= EVAL_CACHE_SIZE:
+                del _EVAL_CACHE[next(iter(_EVAL_CACHE))]
+            # Own top-level copy, so callers adding/replacing keys can't touch the cache
+            _EVAL_CACHE[key] = dict(out)
+    return out
+
 # ---------------------------
 # Core evaluator
 # ---------------------------
-def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
-    rp = RULEPACK
+def _evaluate(payload: Dict[str, Any], rp: CompiledRulepack) -> Dict[str, Any]:
     case_id = payload.get("case_id", "UNKNOWN")
 
     # Bind thresholds
-    suff_min = payload.get("thresholds", {}).get("sufficiency_min",
-                 rp["thresholds"]["sufficiency_min_default"])
-    edd_cut = payload.get("thresholds", {}).get("edd_cutoff_score",
-                 rp["thresholds"]["edd_cutoff_score_default"])
-    bands = rp["thresholds"]["bands"]
+    thresholds = payload.get("thresholds", {})
+    suff_min = thresholds.get("sufficiency_min", rp.sufficiency_min_default)
+    edd_cut = thresholds.get("edd_cutoff_score", rp.edd_cutoff_default)
 
     # Short-hands from input
     screening = payload.get("screening_summary", {}) or {}
@@ -122,6 +346,16 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
     product = risk_features.get("product", {}) or {}
     channel = risk_features.get("channel", {}) or {}
 
+    # Bind every input field once; the dimension sections below only read locals
+    sanc = sanctions.get("status", "clear")
+    peps = pep.get("status", "clear")
+    am_sev, am_hits = adverse_media.get("severity", "none"), adverse_media.get("hits", 0)
+    geo_label, geo_pay, geo_src, geo_cc = (
+        geo.get("label", "low"), geo.get("payment_countries") or (),
+        geo.get("source_countries") or (), geo.get("customer_country", "UAE"))
+    prod_label, prod_list = product.get("label", "low"), product.get("products") or ()
+    ch_onboarding, ch_cash = channel.get("onboarding_channel", "branch"), channel.get("cash_intensity")
+
     dvds = payload.get("declared_vs_discovered", []) or []
     issues = payload.get("issues", []) or []
     evidence_sources = payload.get("evidence_sources", []) or []
@@ -129,153 +363,118 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
     pattern_tag = payload.get("pattern_tag", "Other")
 
     # ---------- Dimension: GEO ----------
-    geo_cfg = rp["dimensions"]["geo_risk"]
-    base_map = geo_cfg["score_map"]["base"]
-    base_score = base_map.get(geo.get("label", "low"), 5)
+    base_score = rp.geo_base_map.get(geo_label, 5)
 
-    fatf_conf = geo_cfg["modifiers"]["fatf_exposure"]
-    grey_list = fatf_conf["list"]["grey"]
-    black_list = fatf_conf["list"]["black"]
-    add_if_in = fatf_conf["add_if_in"]
-
-    pay_countries = geo.get("payment_countries", []) or []
-    match_grey = any_in(pay_countries, grey_list)
-    match_black = any_in(pay_countries, black_list)
+    pay_set = {c.lower() for c in geo_pay}
+    match_grey = first_listed(pay_set & rp.geo_grey, rp.geo_grey_names)
+    match_black = first_listed(pay_set & rp.geo_black, rp.geo_black_names)
 
     geo_bonus = 0
     reason_geo = "Geo exposure aligns with declared residency and sources."
-    label_geo = geo.get("label", "low")
 
     if match_black:
-        geo_bonus += add_if_in["black"]
+        geo_bonus += rp.geo_add_black
         reason_geo = f"Payments involve FATF blacklisted jurisdiction ({match_black})."
     elif match_grey:
-        geo_bonus += add_if_in["grey"]
-        cc = geo.get("customer_country", "UAE")
-        reason_geo = f"Customer residency is {cc} (neutral), but remittance to FATF-greylisted jurisdiction noted ({match_grey})."
+        geo_bonus += rp.geo_add_grey
+        reason_geo = f"Customer residency is {geo_cc} (neutral), but remittance to FATF-greylisted jurisdiction noted ({match_grey})."
 
     dim_geo = {
         "score": base_score + geo_bonus,
-        "label": label_geo,
+        "label": geo_label,
         "reason": reason_geo
     }
 
     # ---------- Dimension: PEP/Sanctions ----------
-    ps_cfg = rp["dimensions"]["pep_sanctions"]["rules"]
     hard_edd = False
     ps_score, ps_label, ps_reason = 0, "low", "No PEP match. No sanctions alerts from screening summary."
-    def status_to_case(s: Dict[str, Any]) -> str:
-        return s.get("status", "clear")
-
-    sanc = status_to_case(sanctions)
-    peps = status_to_case(pep)
 
     # Priority: match > possible > clear
     if "match" in (sanc, peps):
-        rule = next(r for r in ps_cfg if r["when"] == "match")
-        ps_score, ps_label, ps_reason = rule["score"], rule["label"], rule["reason"]
-        hard_edd = (rule.get("hard_route") == "EDD")
+        ps_score, ps_label, ps_reason, hard_route = rp.ps_rules["match"]
+        hard_edd = (hard_route == "EDD")
     elif "possible" in (sanc, peps):
-        rule = next(r for r in ps_cfg if r["when"] == "possible")
-        ps_score, ps_label, ps_reason = rule["score"], rule["label"], rule["reason"]
+        ps_score, ps_label, ps_reason, _ = rp.ps_rules["possible"]
     else:
-        rule = next(r for r in ps_cfg if r["when"] == "clear")
-        ps_score, ps_label, ps_reason = rule["score"], rule["label"], rule["reason"]
+        ps_score, ps_label, ps_reason, _ = rp.ps_rules["clear"]
 
     dim_ps = {"score": ps_score, "label": ps_label, "reason": ps_reason, "hard_route": "EDD" if hard_edd else None}
 
     # ---------- Dimension: Adverse media ----------
-    am_cfg = rp["dimensions"]["adverse_media"]
-    sev = adverse_media.get("severity", "none")
-    sev_to_score = am_cfg["mapping"]["severity_to_score"]
-    sev_to_label = am_cfg["mapping"]["severity_to_label"]
-    am_score = sev_to_score.get(sev, 0)
-    am_label = sev_to_label.get(sev, "low")
-    if sev == "none":
+    am_score = rp.am_sev_to_score.get(am_sev, 0)
+    am_label = rp.am_sev_to_label.get(am_sev, "low")
+    if am_sev == "none":
         am_reason = "No negative media hits in top-tier news sources."
     else:
-        hits = adverse_media.get("hits", 0)
-        am_reason = f"Adverse media severity {sev} ({hits} hits)."
+        am_reason = f"Adverse media severity {am_sev} ({am_hits} hits)."
     dim_am = {"score": am_score, "label": am_label, "reason": am_reason}
 
     # ---------- Detectives for pattern risk ----------
-    pat_cfg = rp["dimensions"]["pattern_risk"]
-    base_pattern = pat_cfg["base_by_pattern"].get(pattern_tag, pat_cfg["base_by_pattern"]["Other"])
-    mod_cfg = pat_cfg["inconsistency_modifiers"]
+    base_pattern = rp.pr_base_by_pattern.get(pattern_tag, rp.pr_base_other)
 
     # salaried_high_cash
-    salaried_high_cash = pattern_tag in ["WPS_Salary", "Salary_Plus_Property"] and channel.get("cash_intensity") == "high"
-    # rental_count_mismatch
-    rental_count_mismatch = exists_alignment_mismatch(dvds, ["Property Holdings", "Rental Income"])
-    # dividend_missing_proof
-    dividend_missing = exists_alignment_mismatch(dvds, ["Dividend"])
+    salaried_high_cash = pattern_tag in _SALARIED_PATTERNS and ch_cash == "high"
+    # rental_count_mismatch / dividend_missing_proof, plus the evidence-gap alignment inputs
+    rental_count_mismatch, dividend_missing, prop_or_div_mismatch, align_pts = _scan_dvds(
+        dvds, rp.eg_align_points, rp.eg_max_align_points)
 
     pr_score = base_pattern
     pr_reasons = []
     if salaried_high_cash:
-        pr_score += mod_cfg["salaried_high_cash"]
+        pr_score += rp.pr_add_salaried_high_cash
         pr_reasons.append("Large cash deposits inconsistent with declared salaried profile. Potential layering risk.")
     if rental_count_mismatch:
-        pr_score += mod_cfg["rental_count_mismatch"]
+        pr_score += rp.pr_add_rental_count_mismatch
         pr_reasons.append("Mismatch in declared vs discovered rental properties.")
     if dividend_missing:
-        pr_score += mod_cfg["dividend_missing_proof"]
+        pr_score += rp.pr_add_dividend_missing_proof
         pr_reasons.append("Dividend income declared without sufficient proof.")
     if not pr_reasons:
         pr_reasons.append(f"Pattern risk evaluated for {pattern_tag}.")
 
-    pr_label = "low" if pr_score <= 9 else "medium" if pr_score <= 19 else "high"
+    pr_label = label_from_bounds(pr_score, PR_LABEL_BOUNDS)
     dim_pr = {"score": pr_score, "label": pr_label, "reason": "; ".join(pr_reasons)}
 
     # ---------- Evidence gaps ----------
-    eg_cfg = rp["dimensions"]["evidence_gaps"]["scoring"]
-    base_gap = eg_cfg["base_from_sufficiency"]["when_low"] if suff_after < suff_min else eg_cfg["base_from_sufficiency"]["when_ok"]
+    base_gap = rp.eg_base_when_low if suff_after < suff_min else rp.eg_base_when_ok
 
     # per-issue points (cap)
-    impact_map = eg_cfg["per_issue_points"]
+    impact_map = rp.eg_issue_points
     per_issue = 0
     for it in issues:
         per_issue += impact_map.get(it.get("residual_impact", "none"), 0)
-    per_issue = min(per_issue, eg_cfg["max_issue_points"])
-
-    # alignment points from dvds (cap)
-    align_map = eg_cfg["partial_alignment_points"]
-    align_pts = collect_alignment_points(dvds, align_map, align_map["max_alignment_points"])
+    per_issue = min(per_issue, rp.eg_max_issue_points)
 
     eg_score = base_gap + per_issue + align_pts
-    eg_label = "low" if eg_score <= 7 else "medium" if eg_score <= 15 else "high"
+    eg_label = label_from_bounds(eg_score, EG_LABEL_BOUNDS)
 
     eg_reason_bits = []
     if suff_after < suff_min:
         eg_reason_bits.append("Evidence sufficiency below policy threshold.")
     if any(i.get("type") == "MISSING_EVIDENCE" for i in issues):
         eg_reason_bits.append("Missing documentary proof for one or more declared sources.")
-    if exists_alignment_mismatch(dvds, ["Property Holdings", "Dividend"]):
+    if prop_or_div_mismatch:
         eg_reason_bits.append("Declared properties/dividends not fully evidenced.")
     if not eg_reason_bits:
         eg_reason_bits.append("Residual gaps assessed post-HITL.")
     dim_eg = {"score": eg_score, "label": eg_label, "reason": "; ".join(eg_reason_bits)}
 
     # ---------- Product / channel ----------
-    pc_cfg = rp["dimensions"]["product_channel"]
-    base_pc = pc_cfg["base_by_label"].get(product.get("label", "low"), 5)
-    ch_add = pc_cfg["channel_adders"].get(channel.get("onboarding_channel", "branch"), 0)
+    base_pc = rp.pc_base_by_label.get(prod_label, 5)
+    ch_add = rp.pc_channel_adders.get(ch_onboarding, 0)
 
-    sc = geo.get("source_countries", []) or []
-    pc = geo.get("payment_countries", []) or []
-    is_cross_border = cross_border(sc, pc)
+    is_cross_border = cross_border(geo_src, pay_set)
 
-    prod_list = product.get("products", []) or []
-    off_hint = offshore_hint(prod_list, pc_cfg.get("offshore_keywords", []))
+    off_hint = offshore_hint(prod_list, rp.pc_offshore_keywords)
 
     xb_add = 0
     if is_cross_border:
-        xb_add += pc_cfg["cross_border_adders"]["non_uae_flow"]
+        xb_add += rp.pc_add_non_uae_flow
     if off_hint:
-        xb_add += pc_cfg["cross_border_adders"]["offshore_investment_hint"]
+        xb_add += rp.pc_add_offshore_hint
 
     pc_score = base_pc + ch_add + xb_add
-    pc_label = "low" if pc_score <= 7 else "medium" if pc_score <= 14 else "high"
+    pc_label = label_from_bounds(pc_score, PC_LABEL_BOUNDS)
 
     if off_hint:
         pc_reason = "Use of offshore investment platform detected; cross-border complexity."
@@ -296,15 +495,15 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
     total = sum(v["score"] for v in dimensions.values())
 
-    if total >= bands["high"]:
+    if total >= rp.band_high:
         risk_label = "high"
-    elif total >= bands["medium"]:
+    elif total >= rp.band_medium:
         risk_label = "medium"
     else:
         risk_label = "low"
 
     route = "Baseline"
-    if dim_ps.get("hard_route") == "EDD":
+    if hard_edd:
         route = "EDD"
     elif suff_after < suff_min:
         route = "EDD"
@@ -325,7 +524,14 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
     decision_explanation = f"Overall {risk_label} risk. {primary} push the case to {route}."
 
     # ---------- Confidence ----------
-    avg_conf = avg([e.get("confidence", 0.0) for e in evidence_sources])
+    n_sources = len(evidence_sources)
+    avg_conf = 0.0
+    if n_sources:
+        confs = [e.get("confidence", 0.0) for e in evidence_sources]
+        try:
+            avg_conf = math.fsum(confs) / n_sources
+        except OverflowError:  # fsum raises where sum() just returns inf
+            avg_conf = sum(confs) / n_sources
     model_confidence = clamp(avg_conf * (0.8 + 0.2 * suff_after), 0.0, 1.0)
 
     assessor = {
@@ -343,10 +549,10 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
         "model_confidence": round(model_confidence, 2),
         "dimensions": dimensions,
         "red_flags": red_flags,
-        "policy_refs": rp.get("policy_refs", []),
-        "rulepack_version": rp.get("rulepack_version", "unknown"),
+        "policy_refs": list(rp.policy_refs),
+        "rulepack_version": rp.version,
         "decision_explanation": decision_explanation,
-        "timestamp": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "timestamp": _now_iso(),
         "assessor": assessor
     }
     return out
@@ -354,32 +560,69 @@ def evaluate(payload: Dict[str, Any]) -> Dict[str, Any]:
 # ---------------------------
 # FastAPI
 # ---------------------------
-app = FastAPI(title="SoW Risk Rule Evaluator", version="1.0.0")
+app = FastAPI(title="SoW Risk Rule Evaluator", version="1.0.0", default_response_class=ORJSONResponse)
 
 @app.get("/healthz")
 def healthz():
     return {"status": "ok", "rulepack": RULEPACK.get("rulepack_version", "unknown")}
 
+def _json_response(content: Any) -> JSONResponse:
+    # orjson rejects ints wider than 64 bits (e.g. an echoed case_id); the stdlib encoder doesn't
+    try:
+        return ORJSONResponse(content)
+    except orjson.JSONEncodeError:
+        return JSONResponse(content)
+
+async def _raw_body(request: Request) -> bytes:
+    # Starlette keeps the body FastAPI already read to parse the request
+    return await request.body()
+
 @app.post("/evaluate")
-def evaluate_endpoint(req: EvaluateRequest):
+def evaluate_endpoint(req: EvaluateRequest, raw: bytes = Depends(_raw_body)):
     try:
         payload = req.root          # <— RootModel in pydantic v2
-        result = evaluate(payload)
-        return JSONResponse(result)
+        return _json_response(evaluate(payload, raw))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/evaluate_batch")
+def evaluate_batch_endpoint(req: BatchRequest):
+    cases = req.root.get("cases")
+    if cases is None:
+        raise HTTPException(status_code=400, detail="Missing 'cases' list")
+    # Bound the work a single call can queue up
+    if len(cases) > MAX_BATCH_CASES:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(cases)} cases (max {MAX_BATCH_CASES})")
+    results = []
+    for i, payload in enumerate(cases):
+        try:
+            results.append(evaluate(payload))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"cases[{i}]: {e}")
+    return _json_response({"results": results})
+
+# Per-process: with several workers only the one handling this request reloads
 @app.post("/reload")
 def reload_rulepack():
-    global RULEPACK
-    RULEPACK = load_rulepack()
+    global RULEPACK, RP_C
+    # Parse and compile before swapping so in-flight requests never see a half-built pack
+    rulepack = load_rulepack()
+    compiled = compile_rulepack(rulepack)
+    RULEPACK, RP_C = rulepack, compiled
+    clear_eval_cache()
     return {"status": "reloaded", "rulepack": RULEPACK.get("rulepack_version", "unknown")}
 
 if __name__ == "__main__":
-
-   # uvicorn.run("risk_assesment_rule_engine:app", host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", {$PORT})), reload=False)
-  # port = int(os.environ.get("PORT", 5000))
-  # app.run(host="0.0.0.0", port=port)
-
+    # Each worker is a separate process that imports this module, so RULEPACK/RP_C
+    # are loaded once per worker at startup. POST /reload only refreshes the worker
+    # that served it; send SIGHUP to the uvicorn master to restart every worker
+    # with the current rulepack.
     port = int(os.environ.get("PORT", 8000))  # Render sets $PORT, fallback to 8000
-    uvicorn.run("rgßgisk_assessment_rule_engine:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+    uvicorn.run(
+        "risk_assesment_rule_engine:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=port,
+        workers=int(os.getenv("WORKERS", "4")),
+        loop="uvloop",
+        http="httptools",
+    )
@@ -6,36 +6,90 @@
 # - Produces per-document findings and an overall summary
 #
 # Run:
-#   pip install fastapi uvicorn pydantic
+#   pip install fastapi uvicorn pydantic orjson
 #   uvicorn risk_engine_api:app --reload
 #
+# Optional: pip install numba   (JIT-compiles score aggregation for large payloads)
+#
 # Test (curl):
 #   curl -X POST http://127.0.0.1:8000/assess -H "Content-Type: application/json" -d @sample_payload.json
 # ------------------------------------------------------------
 
 from __future__ import annotations
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic_core import PydanticCustomError
 from datetime import datetime
+from array import array
+import bisect
+import orjson
 import re
 
+try:
+    import numpy as np
+    import numba
+    _NUMBA_AVAILABLE = True
+except ImportError:  # pure-Python aggregation fallback
+    _NUMBA_AVAILABLE = False
+
+# -----------------------------
+# Request limits
+# -----------------------------
+# Bound the work one request can cause; violations are answered with 413.
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_DOCUMENTS = 256
+MAX_ANOMALIES_PER_DOC = 1024
+
+_TOO_LARGE = "payload_too_large"
+
+def _check_len(value: Any, limit: int, what: str) -> Any:
+    # Runs before item validation, so an oversized list is rejected without parsing its items
+    if isinstance(value, list) and len(value) > limit:
+        raise PydanticCustomError(_TOO_LARGE, "{what}: {count} items exceeds limit of {limit}",
+                                  {"what": what, "count": len(value), "limit": limit})
+    return value
+
 # -----------------------------
 # Data Models
 # -----------------------------
+# Requests are validated with Pydantic; responses are plain slotted dataclasses
+# built by the engine itself, so there is nothing to re-validate on the way out.
 
 class ExtractedData(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     anomalies: Optional[List[str]] = None
     extraction_errors: Optional[List[str]] = None
 
 class DocumentItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     url: str
     type: str = Field(..., description="SoW category for this document")
     extracted_data: Dict[str, Any] = Field(default_factory=dict)
     anomalies: Optional[List[str]] = None
 
+    @field_validator("anomalies", mode="before")
+    @classmethod
+    def _cap_anomalies(cls, v: Any) -> Any:
+        return _check_len(v, MAX_ANOMALIES_PER_DOC, "anomalies")
+
+    @field_validator("extracted_data", mode="before")
+    @classmethod
+    def _cap_extracted_anomalies(cls, v: Any) -> Any:
+        if isinstance(v, dict):
+            _check_len(v.get("anomalies"), MAX_ANOMALIES_PER_DOC, "extracted_data.anomalies")
+        return v
+
 class ClientProfile(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     name: str
     dob: str
     residency: Optional[str] = None
@@ -43,17 +97,26 @@ class ClientProfile(BaseModel):
     properties: Optional[List[str]] = None
 
 class AssessmentRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     documents: List[DocumentItem]
     raw_text_by_url: Dict[str, str]
     client_profile: ClientProfile
 
-class RuleFinding(BaseModel):
+    @field_validator("documents", mode="before")
+    @classmethod
+    def _cap_documents(cls, v: Any) -> Any:
+        return _check_len(v, MAX_DOCUMENTS, "documents")
+
+@dataclass(slots=True)
+class RuleFinding:
     rule_id: str
     severity: str
     message: str
     score_delta: int
 
-class DocumentAssessment(BaseModel):
+@dataclass(slots=True)
+class DocumentAssessment:
     url: str
     doc_type: str
     base_score: int
@@ -61,7 +124,8 @@ class DocumentAssessment(BaseModel):
     doc_risk_score: int
     doc_risk_band: str
 
-class AssessmentResponse(BaseModel):
+@dataclass(slots=True)
+class AssessmentResponse:
     total_score: int
     risk_band: str
     needs_edd: bool
@@ -82,6 +146,34 @@ SEVERITY_TO_POINTS = {
     "low": 3,
 }
 
+# Integer severity codes used while scanning; findings are only materialized after scoring
+LOW, MEDIUM, HIGH, CRITICAL = 0, 1, 2, 3
+SEVERITY_NAMES = ("low", "medium", "high", "critical")
+_PTS = tuple(SEVERITY_TO_POINTS[name] for name in SEVERITY_NAMES)
+
+# Per-document findings stored column-wise: int8 severity codes for scoring, (rule_id, message) for the response
+class FindingColumns:
+    __slots__ = ("codes", "meta")
+
+    def __init__(self) -> None:
+        self.codes = array("b")
+        self.meta: List[Tuple[str, str]] = []
+
+    def add(self, rule_id: str, code: int, message: str) -> None:
+        self.codes.append(code)
+        self.meta.append((rule_id, message))
+
+    def extend(self, other: FindingColumns) -> None:
+        self.codes.extend(other.codes)
+        self.meta.extend(other.meta)
+
+    def materialize(self) -> List[RuleFinding]:
+        names, pts = SEVERITY_NAMES, _PTS
+        return [
+            RuleFinding(rule_id=rule_id, severity=names[code], message=message, score_delta=pts[code])
+            for code, (rule_id, message) in zip(self.codes, self.meta)
+        ]
+
 RISK_BANDS = [
     (0, "Low"),
     (25, "Medium"),
@@ -89,23 +181,84 @@ RISK_BANDS = [
     (80, "Severe"),
 ]
 
-HIGH_RISK_GEOS = {"iran", "north korea", "syria", "cuba", "russia", "crimea"}
-MEDIUM_RISK_GEOS = {"india", "nigeria", "pakistan", "turkey", "uae", "south africa"}
+HIGH_RISK_GEOS = frozenset({"iran", "north korea", "syria", "cuba", "russia", "crimea"})
+MEDIUM_RISK_GEOS = frozenset({"india", "nigeria", "pakistan", "turkey", "uae", "south africa"})
+
+def _tail_country(addr: str) -> str:
+    # Country is the last ","/";"-separated component of the lowercased address
+    a = addr.lower()
+    i = max(a.rfind(","), a.rfind(";"))
+    return a[i + 1:].strip() if i >= 0 else a.strip()
+
+_BAND_THRESH = [t for t, _ in RISK_BANDS]
+_BAND_NAMES = [n for _, n in RISK_BANDS]
 
 def band_from_score(score: int) -> str:
-    band = RISK_BANDS[0][1]
-    for thresh, name in RISK_BANDS:
-        if score >= thresh:
-            band = name
-    return band
+    # Scores below the first threshold still fall into the first band
+    i = bisect.bisect_right(_BAND_THRESH, score) - 1
+    return _BAND_NAMES[max(i, 0)]
+
+# Accepts YYYY-MM-DD, YYYY/MM/DD, DD-MM-YYYY and DD/MM/YYYY (one separator per date).
+# Day/month/year sub-patterns are strptime's own %d/%m/%Y, so e.g. " 5" days still parse.
+_D = r"(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])"
+_M = r"(1[0-2]|0[1-9]|[1-9])"
+_Y = r"(\d\d\d\d)"
+_DATE_RE = re.compile(rf"{_Y}([-/]){_M}\2{_D}|{_D}([-/]){_M}\6{_Y}")
 
 def parse_date_any(s: str) -> Optional[datetime]:
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            continue
-    return None
+    if not isinstance(s, str):
+        return None
+    m = _DATE_RE.fullmatch(s)
+    if not m:
+        return None
+    if m.group(1):
+        y, mo, d = m.group(1), m.group(3), m.group(4)
+    else:
+        d, mo, y = m.group(5), m.group(7), m.group(8)
+    try:
+        return datetime(int(y), int(mo), int(d))
+    except ValueError:  # shape matched but not a real calendar date
+        return None
+
+# Below this many findings the numpy round-trip costs more than the loop it replaces
+_NUMBA_MIN_FINDINGS = 256
+
+if _NUMBA_AVAILABLE:
+    _POINTS = np.array(_PTS, dtype=np.int32)
+
+    @numba.njit(cache=True)
+    def _aggregate_scores(codes, doc_offsets, points):
+        n_docs = doc_offsets.shape[0] - 1
+        out = np.zeros(n_docs, dtype=np.int64)
+        for d in range(n_docs):
+            s = 0
+            for i in range(doc_offsets[d], doc_offsets[d + 1]):
+                s += points[codes[i]]
+            out[d] = s
+        return out
+
+# Sum severity points per document; doc d owns codes[doc_offsets[d]:doc_offsets[d+1]]
+def aggregate_doc_scores(codes: array, doc_offsets: List[int]) -> List[int]:
+    if _NUMBA_AVAILABLE and len(codes) >= _NUMBA_MIN_FINDINGS:
+        return _aggregate_scores(
+            np.frombuffer(codes, dtype=np.int8),
+            np.asarray(doc_offsets, dtype=np.int64),
+            _POINTS,
+        ).tolist()
+    pts = _PTS
+    return [sum(pts[c] for c in codes[lo:hi]) for lo, hi in zip(doc_offsets, doc_offsets[1:])]
+
+# Anomaly strings are classified by their (case-insensitive) prefix. ASCII-only case folding
+# keeps this equivalent to str.lower().startswith(): under Unicode folding "ſupporting" or
+# "client_profİle" would match but not lower() to an _ANOM_MAP key.
+_ANOM_RE = re.compile(r"(field_error|client_profile|evidence|supporting)", re.IGNORECASE | re.ASCII)
+_ANOM_MAP = {
+    "field_error": ("ANOM.FIELD", MEDIUM),
+    "client_profile": ("ANOM.CLIENT", HIGH),
+    "evidence": ("ANOM.EVIDENCE", LOW),
+    "supporting": ("ANOM.EVIDENCE", LOW),
+}
+_ANOM_DEFAULT = ("ANOM.GENERIC", LOW)
 
 @dataclass
 class RuleResult:
@@ -114,97 +267,96 @@ class RuleResult:
     message: str
     delta: int
 
+# (employment, identity, property/geo) rules per doc_type; batches repeat a few SoW categories
+@lru_cache(maxsize=256)
+def rules_for_type(doc_type: str) -> Tuple[bool, bool, bool]:
+    return (
+        doc_type.lower().startswith("employment"),
+        "Identity" in doc_type,
+        "Real Estate" in doc_type or "Asset" in doc_type,
+    )
+
 class RiskRuleEngine:
     def __init__(self, client: ClientProfile):
         self.client = client
 
-    def _finding(self, rule_id: str, severity: str, message: str) -> RuleFinding:
-        pts = SEVERITY_TO_POINTS[severity]
-        return RuleFinding(rule_id=rule_id, severity=severity, message=message, score_delta=pts)
-
-    def rule_anomaly_strings(self, item: DocumentItem) -> List[RuleFinding]:
-        findings: List[RuleFinding] = []
+    def rule_anomaly_strings(self, item: DocumentItem) -> FindingColumns:
+        findings = FindingColumns()
         for a in (item.anomalies or []) + (item.extracted_data.get("anomalies") or []):
-            if a.lower().startswith("field_error"):
-                findings.append(self._finding("ANOM.FIELD", "medium", a))
-            elif a.lower().startswith("client_profile"):
-                findings.append(self._finding("ANOM.CLIENT", "high", a))
-            elif a.lower().startswith("evidence") or a.lower().startswith("supporting"):
-                findings.append(self._finding("ANOM.EVIDENCE", "low", a))
-            else:
-                findings.append(self._finding("ANOM.GENERIC", "low", a))
+            m = _ANOM_RE.match(a)
+            rule_id, sev_code = _ANOM_MAP[m.group(1).lower()] if m else _ANOM_DEFAULT
+            findings.add(rule_id, sev_code, a)
         return findings
 
-    def rule_employment_consistency(self, item: DocumentItem) -> List[RuleFinding]:
-        f: List[RuleFinding] = []
-        if item.type.lower().startswith("employment"):
-            ed = item.extracted_data
-            monthly = ed.get("monthly_salary")
-            annual = self.client.annual_income
-            if monthly and annual:
-                annual_from_monthly = float(monthly) * 12.0
-                if abs(annual_from_monthly - float(annual)) > 0.1 * float(annual):
-                    f.append(self._finding(
-                        "EMP.INCOME.MISMATCH",
-                        "high",
-                        f"Monthly ({monthly}) x12 != client annual ({annual}).",
-                    ))
-            sd = ed.get("start_date")
-            if sd:
-                d = parse_date_any(sd)
-                if d and d > datetime.utcnow():
-                    f.append(self._finding("EMP.DATE.FUTURE", "medium", f"Employment start_date {sd} is in the future."))
-            slips = ed.get("salary_slip_dates") or []
-            if isinstance(slips, list) and len(slips) < 3:
-                f.append(self._finding("EMP.PAYSLIPS.INSUFFICIENT", "medium", "Fewer than 3 salary slip dates provided."))
-            if ed.get("bank_statement_match") is False:
-                f.append(self._finding("EMP.BANK.MATCH.FALSE", "high", "Salary not matched on bank statement."))
+    # The type-specific rules below assume apply_rules() already matched item.type
+    def rule_employment_consistency(self, item: DocumentItem) -> FindingColumns:
+        f = FindingColumns()
+        ed = item.extracted_data
+        monthly = ed.get("monthly_salary")
+        annual = self.client.annual_income
+        if monthly and annual:
+            annual_from_monthly = float(monthly) * 12.0
+            if abs(annual_from_monthly - float(annual)) > 0.1 * float(annual):
+                f.add(
+                    "EMP.INCOME.MISMATCH",
+                    HIGH,
+                    f"Monthly ({monthly}) x12 != client annual ({annual}).",
+                )
+        sd = ed.get("start_date")
+        if sd:
+            d = parse_date_any(sd)
+            if d and d > datetime.utcnow():
+                f.add("EMP.DATE.FUTURE", MEDIUM, f"Employment start_date {sd} is in the future.")
+        slips = ed.get("salary_slip_dates") or []
+        if isinstance(slips, list) and len(slips) < 3:
+            f.add("EMP.PAYSLIPS.INSUFFICIENT", MEDIUM, "Fewer than 3 salary slip dates provided.")
+        if ed.get("bank_statement_match") is False:
+            f.add("EMP.BANK.MATCH.FALSE", HIGH, "Salary not matched on bank statement.")
         return f
 
-    def rule_identity_checks(self, item: DocumentItem) -> List[RuleFinding]:
-        f: List[RuleFinding] = []
-        if "Identity" in item.type:
-            ed = item.extracted_data
-            if ed.get("address_verification") is False:
-                f.append(self._finding("ID.ADDRESS.UNVERIFIED", "high", "Address verification missing/false."))
-            if ed.get("residency_status") in (None, "", "null"):
-                f.append(self._finding("ID.RESIDENCY.MISSING", "medium", "Residency status missing."))
-            doc_dob = ed.get("date_of_birth") or ed.get("dob")
-            if doc_dob:
-                doc_d = parse_date_any(doc_dob) or parse_date_any(str(doc_dob))
-                client_d = parse_date_any(self.client.dob) or parse_date_any(str(self.client.dob))
-                if doc_d and client_d and doc_d.date() != client_d.date():
-                    f.append(self._finding("ID.DOB.MISMATCH", "critical", f"DOB mismatch: doc={doc_dob}, client={self.client.dob}"))
+    def rule_identity_checks(self, item: DocumentItem) -> FindingColumns:
+        f = FindingColumns()
+        ed = item.extracted_data
+        if ed.get("address_verification") is False:
+            f.add("ID.ADDRESS.UNVERIFIED", HIGH, "Address verification missing/false.")
+        if ed.get("residency_status") in (None, "", "null"):
+            f.add("ID.RESIDENCY.MISSING", MEDIUM, "Residency status missing.")
+        doc_dob = ed.get("date_of_birth") or ed.get("dob")
+        if doc_dob:
+            doc_d = parse_date_any(doc_dob) or parse_date_any(str(doc_dob))
+            client_d = parse_date_any(self.client.dob) or parse_date_any(str(self.client.dob))
+            if doc_d and client_d and doc_d.date() != client_d.date():
+                f.add("ID.DOB.MISMATCH", CRITICAL, f"DOB mismatch: doc={doc_dob}, client={self.client.dob}")
         return f
 
-    def rule_property_geo_risk(self, item: DocumentItem) -> Tuple[List[RuleFinding], List[str]]:
-        f: List[RuleFinding] = []
+    def rule_property_geo_risk(self, item: DocumentItem) -> Tuple[FindingColumns, List[str]]:
+        f = FindingColumns()
         high_risk_hits: List[str] = []
-        if "Real Estate" in item.type or "Asset" in item.type:
-            props = item.extracted_data.get("properties") or []
-            for p in props:
-                addr = (p.get("address") or "").lower()
-                tokens = re.split(r"[,;]", addr)
-                last = tokens[-1].strip() if tokens else addr
-                if last in HIGH_RISK_GEOS:
-                    high_risk_hits.append(last)
-                    f.append(self._finding("GEO.HIGH", "critical", f"Property located in high-risk geo: {last}"))
-                elif last in MEDIUM_RISK_GEOS:
-                    f.append(self._finding("GEO.MEDIUM", "medium", f"Property located in medium-risk geo: {last}"))
-                if not p.get("property_type"):
-                    f.append(self._finding("PROP.TYPE.MISSING", "medium", "Property type missing in title/deed."))
-                if not p.get("title_deed_ref"):
-                    f.append(self._finding("PROP.DEED.MISSING", "high", "Title deed reference missing."))
+        props = item.extracted_data.get("properties") or []
+        for p in props:
+            last = _tail_country(p.get("address") or "")
+            if last in HIGH_RISK_GEOS:
+                high_risk_hits.append(last)
+                f.add("GEO.HIGH", CRITICAL, f"Property located in high-risk geo: {last}")
+            elif last in MEDIUM_RISK_GEOS:
+                f.add("GEO.MEDIUM", MEDIUM, f"Property located in medium-risk geo: {last}")
+            if not p.get("property_type"):
+                f.add("PROP.TYPE.MISSING", MEDIUM, "Property type missing in title/deed.")
+            if not p.get("title_deed_ref"):
+                f.add("PROP.DEED.MISSING", HIGH, "Title deed reference missing.")
         return f, high_risk_hits
 
-    def apply_rules(self, item: DocumentItem) -> Tuple[List[RuleFinding], List[str]]:
-        findings: List[RuleFinding] = []
+    def apply_rules(self, item: DocumentItem) -> Tuple[FindingColumns, List[str]]:
         high_geo: List[str] = []
-        findings.extend(self.rule_anomaly_strings(item))
-        findings.extend(self.rule_employment_consistency(item))
-        findings.extend(self.rule_identity_checks(item))
-        f_geo, high_geo = self.rule_property_geo_risk(item)
-        findings.extend(f_geo)
+        findings = self.rule_anomaly_strings(item)
+        employment, identity, property_geo = rules_for_type(item.type)
+        if employment:
+            findings.extend(self.rule_employment_consistency(item))
+        if identity:
+            findings.extend(self.rule_identity_checks(item))
+        if property_geo:
+            f_geo, high_geo = self.rule_property_geo_risk(item)
+            findings.extend(f_geo)
         return findings, high_geo
 
 # -----------------------------
@@ -228,24 +380,35 @@ def assess_payload(req: AssessmentRequest) -> AssessmentResponse:
     total_score = 0
     high_geo_hits: List[str] = []
 
+    # Scan every document first, collecting flat severity codes with per-doc offsets
+    cols_by_doc: List[FindingColumns] = []
+    codes = array("b")
+    doc_offsets: List[int] = [0]
     for item in req.documents:
+        cols, doc_high_geo = engine.apply_rules(item)
+        cols_by_doc.append(cols)
+        codes.extend(cols.codes)
+        doc_offsets.append(len(codes))
+        high_geo_hits += doc_high_geo
+
+    doc_scores = aggregate_doc_scores(codes, doc_offsets)
+
+    for item, cols, score in zip(req.documents, cols_by_doc, doc_scores):
         base = 0
-        findings, doc_high_geo = engine.apply_rules(item)
-        doc_score = base + sum(f.score_delta for f in findings)
+        doc_score = base + score
         total_score += doc_score
-        high_geo_hits += doc_high_geo
         per_doc.append(DocumentAssessment(
             url=item.url,
             doc_type=item.type,
             base_score=base,
-            findings=findings,
+            findings=cols.materialize(),
             doc_risk_score=doc_score,
             doc_risk_band=band_from_score(doc_score),
         ))
 
     pep_or_sanctions = mock_pep_sanctions_check(req.client_profile.name)
     if pep_or_sanctions:
-        total_score += SEVERITY_TO_POINTS["critical"] * 2
+        total_score += _PTS[CRITICAL] * 2
 
     risk_band = band_from_score(total_score)
     needs_edd = total_score >= 50 or pep_or_sanctions or len(high_geo_hits) > 0
@@ -279,11 +442,42 @@ def assess_payload(req: AssessmentRequest) -> AssessmentResponse:
 # FastAPI App
 # -----------------------------
 
-app = FastAPI(title="Risk Assessment Rule Engine", version="1.0.0")
-
-@app.post("/assess", response_model=AssessmentResponse)
+app = FastAPI(title="Risk Assessment Rule Engine", version="1.0.0", default_response_class=ORJSONResponse)
+
+class BodySizeLimitMiddleware:
+    # Pure ASGI: only checks the declared Content-Length; reject before the body is read or parsed
+    def __init__(self, app, max_bytes: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_bytes:
+                        response = ORJSONResponse(status_code=413, content={"detail": f"Request body exceeds {self.max_bytes} bytes"})
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_BODY_BYTES)
+
+@app.exception_handler(RequestValidationError)
+async def too_large_handler(request: Request, exc: RequestValidationError):
+    too_large = [e["msg"] for e in exc.errors() if e.get("type") == _TOO_LARGE]
+    if too_large:
+        return ORJSONResponse(status_code=413, content={"detail": too_large})
+    return await request_validation_exception_handler(request, exc)
+
+@app.post("/assess", response_model=None)
 def assess(req: AssessmentRequest):
-    return assess_payload(req)
+    # orjson serializes the dataclasses directly; returning a Response skips jsonable_encoder
+    res = assess_payload(req)
+    try:
+        return ORJSONResponse(res)
+    except orjson.JSONEncodeError:  # ints wider than 64 bits
+        return JSONResponse(asdict(res))
 
 # -----------------------------
 # Sample payload builder
@@ -389,4 +583,4 @@ if __name__ == "__main__":
     payload = AssessmentRequest(**sample_payload())
     res = assess_payload(payload)
     import json
-    print(json.dumps(res.dict(), indent=2))
+    print(json.dumps(asdict(res), indent=2))